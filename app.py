@@ -5,129 +5,561 @@ Team: The Innovators
 """
 
 import re
+import sys
 import json
 import numpy as np
 from datetime import datetime, timedelta
 import logging
-from typing import Dict, List, Tuple, Optional
+from types import MappingProxyType
+from typing import Dict, List, Tuple, Optional, Iterable, Iterator
+
+try:
+    import ahocorasick
+except ImportError:  # pyahocorasick is optional; parse() falls back to re
+    ahocorasick = None
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Below this length a plain loop beats the NumPy path, which pays for the
+# UTF-32 encode and several temporary arrays (crossover is ~90-100 chars)
+SHORT_TEXT_LEN = 100
+
+# Units recognised after a number in quantity detection
+QUANTITY_UNITS = ('kg', 'quintal', 'ton', 'acre', 'hectare')
+
+# Separator for batch scans; no keyword contains it, so no match can span
+# two queries
+BATCH_SENTINEL = '\x00\x00'
+
+# Interned intent names, used as keys everywhere intents are dispatched on
+INTENT_WEATHER = sys.intern('weather')
+INTENT_IRRIGATION = sys.intern('irrigation')
+INTENT_MARKET = sys.intern('market')
+INTENT_FERTILIZER = sys.intern('fertilizer')
+INTENT_PEST = sys.intern('pest')
+INTENT_SCHEME = sys.intern('scheme')
+INTENT_CROP = sys.intern('crop')
+INTENT_GENERAL = sys.intern('general')
+
+
+def _count_scripts(text: str) -> Tuple[int, int]:
+    """Count Devanagari and ASCII letter codepoints in text"""
+    if len(text) < SHORT_TEXT_LEN:
+        hindi = english = 0
+        for ch in text:
+            if '\u0900' <= ch <= '\u097f':
+                hindi += 1
+            elif 'a' <= ch <= 'z' or 'A' <= ch <= 'Z':
+                english += 1
+        return hindi, english
+    
+    codes = np.frombuffer(text.encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+    hindi = np.count_nonzero((codes >= 0x0900) & (codes <= 0x097F))
+    # Setting bit 0x20 folds A-Z onto a-z and moves nothing else into that range
+    folded = codes | 0x20
+    english = np.count_nonzero((folded >= 0x61) & (folded <= 0x7A))
+    return int(hindi), int(english)
+
+# Field positions in _CROP_FLAT rows
+SOWING_SEASON, WATER_REQUIREMENT, FERTILIZER, IDEAL_TEMP, SOIL_PH = range(5)
+
+def _freeze(value):
+    """Recursively convert dicts to read-only mappings and lists to tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+# Intent keyword patterns, shared read-only by every IndicBERTProcessor
+_INTENT_PATTERNS = _freeze({
+    INTENT_WEATHER: [
+        r'barish|rain|mausam|weather|paani|water|baarish',
+        r'humidity|temperature|wind|climate'
+    ],
+    INTENT_IRRIGATION: [
+        r'sinchai|irrigation|paani dena|watering',
+        r'kab paani de|when to water|irrigation timing'
+    ],
+    INTENT_MARKET: [
+        r'mandi|price|rate|bhav|market|sell|bechna',
+        r'commodity price|market rate|selling price'
+    ],
+    INTENT_FERTILIZER: [
+        r'khad|fertilizer|urvarak|nutrients|manure',
+        r'NPK|urea|phosphate|potash|organic'
+    ],
+    INTENT_PEST: [
+        r'keeda|pest|insect|disease|bimari|fungus',
+        r'crop disease|plant protection|pesticide'
+    ],
+    INTENT_SCHEME: [
+        r'yojana|scheme|subsidy|government|sarkar',
+        r'loan|credit|insurance|financial help'
+    ],
+    INTENT_CROP: [
+        r'fasal|crop|bija|seed|planting|cultivation',
+        r'sowing|harvesting|crop calendar|variety'
+    ]
+})
+
+# Crop and location tables are pure literal alternatives, so they are
+# matched with substring tests rather than the regex engine
+_CROPS = _freeze({
+    'wheat': ('gehun', 'wheat', 'गेहूं'),
+    'rice': ('chawal', 'rice', 'धान', 'चावल'),
+    'cotton': ('kapas', 'cotton', 'कपास'),
+    'sugarcane': ('ganna', 'sugarcane', 'गन्ना'),
+    'potato': ('aloo', 'potato', 'आलू'),
+    'tomato': ('tamatar', 'tomato', 'टमाटर'),
+    'onion': ('pyaz', 'onion', 'प्याज')
+})
+_LOCATIONS = _freeze({
+    'delhi': ('delhi', 'दिल्ली'),
+    'punjab': ('punjab', 'पंजाब'),
+    'haryana': ('haryana', 'हरियाणा'),
+    'up': ('uttar pradesh', 'up', 'उत्तर प्रदेश'),
+    'bihar': ('bihar', 'बिहार'),
+    'maharashtra': ('maharashtra', 'महाराष्ट्र')
+})
+
+
+def _build_intent_tables(intent_patterns: Dict[str, Tuple[str, ...]]) -> Tuple:
+    """
+    Build the keyword tables behind intent scoring
+    Every intent pattern is a plain literal alternation, so all keywords go
+    into one group-free alternation, longest first. Searching it from each
+    hit's start + 1 finds the longest keyword at every position; any other
+    keyword starting there is a prefix of it, so the keyword hits table maps
+    it to the alternative each pattern would match there, and per-pattern
+    scores stay exactly as with re.findall.
+    """
+    intents = tuple(intent_patterns)
+    pattern_keywords = []
+    pattern_intent = []
+    for intent_id, patterns in enumerate(intent_patterns.values()):
+        for pattern in patterns:
+            pattern_keywords.append(pattern.split('|'))
+            pattern_intent.append(intent_id)
+            
+    keywords = sorted(
+        dict.fromkeys(kw for alternatives in pattern_keywords for kw in alternatives),
+        key=len, reverse=True
+    )
+    keyword_hits = {}
+    for keyword in keywords:
+        hits = []
+        for pattern_id, alternatives in enumerate(pattern_keywords):
+            for alternative in alternatives:
+                if keyword.startswith(alternative):
+                    hits.append((pattern_id, len(alternative)))
+                    break
+        keyword_hits[keyword] = tuple(hits)
+    return intents, tuple(pattern_intent), keywords, keyword_hits
+
+
+def _build_automaton(keywords: List[str]):
+    """
+    One Aho-Corasick automaton over every intent, crop and location literal
+    and quantity unit, so parse() can classify a query in a single scan
+    """
+    tags = {}
+    for keyword in keywords:
+        tags.setdefault(keyword, []).append(('intent', keyword))
+    for crop, needles in _CROPS.items():
+        for needle in needles:
+            tags.setdefault(needle, []).append(('crop', crop))
+    for location, needles in _LOCATIONS.items():
+        for needle in needles:
+            tags.setdefault(needle, []).append(('location', location))
+    for unit in QUANTITY_UNITS:
+        tags.setdefault(unit, []).append(('unit', unit))
+        
+    automaton = ahocorasick.Automaton()
+    for word, word_tags in tags.items():
+        automaton.add_word(word, (len(word), tuple(word_tags)))
+    automaton.make_automaton()
+    return automaton
+
+# Intent scoring tables, built once at import
+_INTENTS, _PATTERN_INTENT, _INTENT_KEYWORDS, _KEYWORD_HITS = \
+    _build_intent_tables(_INTENT_PATTERNS)
+_INTENT_UNION = re.compile('|'.join(_INTENT_KEYWORDS))
+
+# Zeroed score template, copied per query instead of built from scratch
+_ZERO_SCORES = np.zeros(len(_INTENTS))
+_ZERO_SCORES.flags.writeable = False
+
+# Gates classify() on any keyword, unit or entity; the automaton does this
+# when pyahocorasick is installed, the regex otherwise
+_AC = _build_automaton(_INTENT_KEYWORDS) if ahocorasick is not None else None
+_ANY_KEYWORD_RE = re.compile('|'.join(map(re.escape, [
+    *_INTENT_KEYWORDS,
+    *(needle for needles in (*_CROPS.values(), *_LOCATIONS.values())
+      for needle in needles),
+    *QUANTITY_UNITS
+])))
+
 class IndicBERTProcessor:
     """
     IndicBERT-based multilingual text processing for Indian languages
     Handles Hindi, English, and regional language queries
     """
     
+    __slots__ = (
+        'supported_languages', 'intent_patterns', 'crops', 'locations',
+        '_intent_union', '_intents', '_pattern_intent',
+        '_keyword_hits', '_zero_scores',
+        '_any_keyword_re', '_ac'
+    )
+    
     def __init__(self):
         self.supported_languages = ['hi', 'en', 'pa', 'bn', 'te', 'mr', 'gu', 'ta']
-        self.intent_patterns = {
-            'weather': [
-                r'barish|rain|mausam|weather|paani|water|baarish',
-                r'humidity|temperature|wind|climate'
-            ],
-            'irrigation': [
-                r'sinchai|irrigation|paani dena|watering',
-                r'kab paani de|when to water|irrigation timing'
-            ],
-            'market': [
-                r'mandi|price|rate|bhav|market|sell|bechna',
-                r'commodity price|market rate|selling price'
-            ],
-            'fertilizer': [
-                r'khad|fertilizer|urvarak|nutrients|manure',
-                r'NPK|urea|phosphate|potash|organic'
-            ],
-            'pest': [
-                r'keeda|pest|insect|disease|bimari|fungus',
-                r'crop disease|plant protection|pesticide'
-            ],
-            'scheme': [
-                r'yojana|scheme|subsidy|government|sarkar',
-                r'loan|credit|insurance|financial help'
-            ],
-            'crop': [
-                r'fasal|crop|bija|seed|planting|cultivation',
-                r'sowing|harvesting|crop calendar|variety'
-            ]
-        }
+        self.intent_patterns = _INTENT_PATTERNS
+        self.crops = _CROPS
+        self.locations = _LOCATIONS
+        
+        # Pre-compiled patterns and tables shared by all instances, so the
+        # hot query path skips re's cache lookup and construction is cheap
+        self._intents = _INTENTS
+        self._pattern_intent = _PATTERN_INTENT
+        self._intent_union = _INTENT_UNION
+        self._keyword_hits = _KEYWORD_HITS
+        self._zero_scores = _ZERO_SCORES
+        self._ac = _AC
+        self._any_keyword_re = _ANY_KEYWORD_RE
         
     def detect_language(self, text: str) -> str:
         """Detect language of input text"""
         # Simple language detection based on script
-        hindi_chars = re.findall(r'[\u0900-\u097F]', text)
-        english_chars = re.findall(r'[a-zA-Z]', text)
+        if text.isascii():
+            # No Devanagari possible, so any letter means English
+            return 'en' if any(ch.isalpha() for ch in text) else 'hi'
+            
+        hindi_chars, english_chars = _count_scripts(text)
         
-        if len(hindi_chars) > len(english_chars):
+        if hindi_chars > english_chars:
             return 'hi'
-        elif len(english_chars) > 0:
+        elif english_chars > 0:
             return 'en'
         else:
             return 'hi'  # Default to Hindi
             
     def extract_intent(self, text: str) -> Tuple[str, float]:
         """Extract intent from user query with confidence score"""
-        text_lower = text.lower()
-        intent_scores = {}
-        
-        for intent, patterns in self.intent_patterns.items():
-            score = 0
-            for pattern in patterns:
-                matches = len(re.findall(pattern, text_lower))
-                score += matches * 0.3
-            intent_scores[intent] = score
+        return self._extract_intent_lower(text.lower())
+        
+    def _extract_intent_lower(self, text_lower: str) -> Tuple[str, float]:
+        """Extract intent from text that is already lowercased"""
+        return self._best_intent(
+            self._score_intent_hits(self._intent_keyword_hits(text_lower)))
+        
+    def _intent_keyword_hits(self, text_lower: str) -> Iterator[Tuple[int, str]]:
+        """Yield (start, keyword) for the longest intent keyword at each position"""
+        search = self._intent_union.search
+        match = search(text_lower)
+        while match is not None:
+            start = match.start()
+            yield start, match.group()
+            match = search(text_lower, start + 1)
             
-        if not intent_scores or max(intent_scores.values()) == 0:
-            return 'general', 0.5
+    def _score_intent_hits(self, hits: Iterable[Tuple[int, str]]) -> np.ndarray:
+        """
+        Score (start, keyword) hits, ordered by start, per intent
+        Each pattern counts its non-overlapping matches and adds 0.3 per match
+        """
+        counts = [0] * len(self._pattern_intent)
+        covered = [0] * len(self._pattern_intent)
+        for start, keyword in hits:
+            for pattern_id, length in self._keyword_hits[keyword]:
+                if start >= covered[pattern_id]:
+                    counts[pattern_id] += 1
+                    covered[pattern_id] = start + length
+                    
+        intent_scores = self._zero_scores.copy()
+        for pattern_id, count in enumerate(counts):
+            if count:
+                intent_scores[self._pattern_intent[pattern_id]] += count * 0.3
+        return intent_scores
+        
+    def _best_intent(self, intent_scores: np.ndarray) -> Tuple[str, float]:
+        """Pick the top-scoring intent, or 'general' when nothing matched"""
+        best = int(intent_scores.argmax())
+        if intent_scores[best] == 0:
+            return INTENT_GENERAL, 0.5
             
-        best_intent = max(intent_scores, key=intent_scores.get)
-        confidence = min(intent_scores[best_intent], 1.0)
+        confidence = min(float(intent_scores[best]), 1.0)
         
-        return best_intent, confidence
+        return self._intents[best], confidence
         
     def extract_entities(self, text: str) -> Dict[str, str]:
         """Extract entities like crop, location, quantity from text"""
+        return self._extract_entities_lower(text.lower())
+        
+    def _extract_entities_lower(self, text_lower: str) -> Dict[str, str]:
+        """Extract entities from text that is already lowercased"""
         entities = {}
         
         # Crop detection
-        crops = {
-            'wheat': r'gehun|wheat|गेहूं',
-            'rice': r'chawal|rice|धान|चावल',
-            'cotton': r'kapas|cotton|कपास',
-            'sugarcane': r'ganna|sugarcane|गन्ना',
-            'potato': r'aloo|potato|आलू',
-            'tomato': r'tamatar|tomato|टमाटर',
-            'onion': r'pyaz|onion|प्याज'
-        }
-        
-        for crop, pattern in crops.items():
-            if re.search(pattern, text.lower()):
+        for crop, needles in self.crops.items():
+            if any(needle in text_lower for needle in needles):
                 entities['crop'] = crop
                 break
                 
         # Location detection
-        locations = {
-            'delhi': r'delhi|दिल्ली',
-            'punjab': r'punjab|पंजाब',
-            'haryana': r'haryana|हरियाणा',
-            'up': r'uttar pradesh|up|उत्तर प्रदेश',
-            'bihar': r'bihar|बिहार',
-            'maharashtra': r'maharashtra|महाराष्ट्र'
-        }
-        
-        for location, pattern in locations.items():
-            if re.search(pattern, text.lower()):
+        for location, needles in self.locations.items():
+            if any(needle in text_lower for needle in needles):
                 entities['location'] = location
                 break
                 
         # Quantity detection
-        quantity_match = re.search(r'(\d+)\s*(kg|quintal|ton|acre|hectare)', text.lower())
-        if quantity_match:
-            entities['quantity'] = quantity_match.group(1)
-            entities['unit'] = quantity_match.group(2)
+        self._extract_quantity(text_lower, entities)
             
         return entities
+        
+    def _extract_quantity(self, text_lower: str, entities: Dict[str, str]) -> None:
+        """Add quantity and unit to entities if the text mentions an amount"""
+        # Find each unit with str.find and read the digits before it; the
+        # leftmost amount wins, as with re.search(r'(\d+)\s*(kg|...)')
+        best = None
+        for unit in QUANTITY_UNITS:
+            idx = text_lower.find(unit)
+            while idx != -1:
+                end = idx
+                while end > 0 and text_lower[end - 1].isspace():
+                    end -= 1
+                start = end
+                while start > 0 and text_lower[start - 1].isdecimal():
+                    start -= 1
+                if start < end:
+                    if best is None or start < best[0]:
+                        best = (start, text_lower[start:end], unit)
+                    break
+                idx = text_lower.find(unit, idx + 1)
+                
+        if best is not None:
+            entities['quantity'] = best[1]
+            entities['unit'] = best[2]
+            
+    def parse(self, text: str) -> Dict:
+        """
+        Extract intent, confidence and entities from a query
+        Uses a single Aho-Corasick scan when pyahocorasick is installed
+        """
+        return self._parse_lower(text.lower())
+        
+    def _parse_lower(self, text_lower: str) -> Dict:
+        """Parse text that is already lowercased"""
+        if self._ac is None:
+            intent, confidence = self._extract_intent_lower(text_lower)
+            return {
+                'intent': intent,
+                'confidence': confidence,
+                'entities': self._extract_entities_lower(text_lower)
+            }
+            
+        longest = {}
+        crops_found = set()
+        locations_found = set()
+        for end, (length, word_tags) in self._ac.iter(text_lower):
+            for kind, value in word_tags:
+                if kind == 'intent':
+                    start = end - length + 1
+                    if length > len(longest.get(start, '')):
+                        longest[start] = value
+                elif kind == 'crop':
+                    crops_found.add(value)
+                elif kind == 'location':
+                    locations_found.add(value)
+                    
+        return self._resolve_parse(text_lower, longest, crops_found, locations_found)
+        
+    def _resolve_parse(self, text_lower: str, longest: Dict[int, str],
+                       crops_found: set, locations_found: set) -> Dict:
+        """Turn the automaton hits collected for one query into a parse() result"""
+        # Longest keyword per start position, as extract_intent sees them
+        intent, confidence = self._best_intent(
+            self._score_intent_hits(sorted(longest.items())))
+        
+        # Entity tables are ordered by priority, as in extract_entities
+        entities = {}
+        for crop in self.crops:
+            if crop in crops_found:
+                entities['crop'] = crop
+                break
+        for location in self.locations:
+            if location in locations_found:
+                entities['location'] = location
+                break
+        self._extract_quantity(text_lower, entities)
+        
+        return {'intent': intent, 'confidence': confidence, 'entities': entities}
+        
+    def classify(self, text: str) -> Tuple[str, float, Dict[str, str]]:
+        """
+        Return (intent, confidence, entities) for a query
+        Off-topic messages with no domain keyword skip the full pipeline
+        """
+        text_lower = text.lower()
+        # Queries without any keyword or unit (greetings, thanks) cannot
+        # yield an intent or entity, so they skip the full pipeline
+        if self._ac is not None:
+            if next(self._ac.iter(text_lower), None) is None:
+                return INTENT_GENERAL, 0.5, {}
+        elif not self._any_keyword_re.search(text_lower):
+            return INTENT_GENERAL, 0.5, {}
+            
+        result = self._parse_lower(text_lower)
+        return result['intent'], result['confidence'], result['entities']
+        
+    def process_batch(self, texts: List[str]) -> List[Dict]:
+        """
+        Parse a batch of queries, returning one parse() result per text
+        Uses a single Aho-Corasick scan over the whole batch when
+        pyahocorasick is installed
+        """
+        lowered = [text.lower() for text in texts]
+        if self._ac is None or not lowered:
+            return [self._parse_lower(text_lower) for text_lower in lowered]
+            
+        # End offset of each query in the joined batch; hits arrive ordered
+        # by end, so the current row only ever moves forward
+        row_ends = []
+        offset = -len(BATCH_SENTINEL)
+        for text_lower in lowered:
+            offset += len(BATCH_SENTINEL) + len(text_lower)
+            row_ends.append(offset)
+            
+        # Rows without a single hit have no intent, entity or unit, so their
+        # hit tables are only created on a row's first hit
+        rows = [None] * len(lowered)
+        row = -1
+        row_end = -1
+        for end, (length, word_tags) in self._ac.iter(BATCH_SENTINEL.join(lowered)):
+            if end >= row_end:
+                while end >= row_end:
+                    row += 1
+                    row_end = row_ends[row]
+                longest, crops_found, locations_found = rows[row] = ({}, set(), set())
+            for kind, value in word_tags:
+                if kind == 'intent':
+                    start = end - length + 1
+                    if length > len(longest.get(start, '')):
+                        longest[start] = value
+                elif kind == 'crop':
+                    crops_found.add(value)
+                elif kind == 'location':
+                    locations_found.add(value)
+                    
+        return [
+            self._resolve_parse(text_lower, *row_hits) if row_hits is not None
+            else {'intent': INTENT_GENERAL, 'confidence': 0.5, 'entities': {}}
+            for text_lower, row_hits in zip(lowered, rows)
+        ]
+
+# Agricultural knowledge base, built once at import and shared read-only
+# by every RAGEngine instance
+_KNOWLEDGE_BASE = _freeze({
+    'crops': {
+        'wheat': {
+            'sowing_season': 'Rabi (October-December)',
+            'harvesting': 'April-May',
+            'water_requirement': 'Medium (4-6 irrigations)',
+            'fertilizer': 'NPK 120:60:40 kg/hectare',
+            'varieties': ['HD-2967', 'PBW-343', 'DBW-17'],
+            'diseases': ['Rust', 'Bunt', 'Leaf blight'],
+            'ideal_temp': '15-25°C',
+            'soil_ph': '6.0-7.5'
+        },
+        'rice': {
+            'sowing_season': 'Kharif (May-July)',
+            'harvesting': 'October-December',
+            'water_requirement': 'High (standing water)',
+            'fertilizer': 'NPK 100:50:50 kg/hectare',
+            'varieties': ['Pusa-44', 'IR-64', 'Swarna'],
+            'diseases': ['Blast', 'Sheath blight', 'Brown spot'],
+            'ideal_temp': '20-35°C',
+            'soil_ph': '5.5-7.0'
+        }
+    },
+    'weather_guidelines': {
+        'irrigation': {
+            'high_humidity': 'Delay irrigation if humidity >80%',
+            'rainfall_expected': 'Skip irrigation if rain expected within 24 hours',
+            'temperature': 'Best irrigation time: early morning or evening'
+        },
+        'spraying': {
+            'wind_speed': 'Avoid spraying if wind speed >10 km/h',
+            'temperature': 'Spray when temperature <30°C',
+            'humidity': 'Best humidity range: 60-80%'
+        }
+    },
+    'market_insights': {
+        'price_factors': [
+            'Seasonal demand',
+            'Weather conditions',
+            'Government procurement',
+            'Export policies',
+            'Storage capacity'
+        ],
+        'selling_tips': [
+            'Monitor MSP announcements',
+            'Check multiple mandis',
+            'Consider storage costs',
+            'Track festival seasons'
+        ]
+    }
+})
+
+# Flat per-crop rows so handlers index a tuple instead of walking dicts
+_CROP_FLAT = {
+    crop: (info['sowing_season'], info['water_requirement'],
+           info['fertilizer'], info['ideal_temp'], info['soil_ph'])
+    for crop, info in _KNOWLEDGE_BASE['crops'].items()
+}
+
+
+def _build_context(intent: Optional[str], crop: Optional[str]) -> Dict:
+    """Build the retrieval context for an intent/crop pair"""
+    sources, facts, recommendations = [], [], []
+    
+    # Crop-specific information
+    crop_info = _CROP_FLAT.get(crop)
+    if crop_info is not None:
+        facts.extend([
+            f"Sowing season: {crop_info[SOWING_SEASON]}",
+            f"Water requirement: {crop_info[WATER_REQUIREMENT]}",
+            f"Recommended fertilizer: {crop_info[FERTILIZER]}"
+        ])
+        sources.append(f"Crop Database - {crop.title()}")
+            
+    # Intent-specific guidelines
+    if intent == INTENT_IRRIGATION:
+        weather_guide = _KNOWLEDGE_BASE['weather_guidelines']['irrigation']
+        recommendations.extend(weather_guide.values())
+        sources.append("Irrigation Best Practices")
+        
+    elif intent == INTENT_MARKET:
+        market_info = _KNOWLEDGE_BASE['market_insights']
+        facts.extend(market_info['selling_tips'])
+        sources.append("Market Intelligence")
+        
+    return {
+        'sources': tuple(sources),
+        'facts': tuple(facts),
+        'recommendations': tuple(recommendations)
+    }
+
+# Context depends only on the crop and on whether the intent has its own
+# guidelines, so every combination is prebuilt; None stands for "any other
+# intent" and "crop not in the knowledge base"
+_CONTEXT_INTENTS = (INTENT_IRRIGATION, INTENT_MARKET)
+_CONTEXTS = {
+    (intent, crop): _build_context(intent, crop)
+    for intent in (*_CONTEXT_INTENTS, None)
+    for crop in (*_CROP_FLAT, None)
+}
 
 class RAGEngine:
     """
@@ -135,92 +567,40 @@ class RAGEngine:
     Combines knowledge base with real-time data for accurate responses
     """
     
+    __slots__ = (
+        'knowledge_base', 'context_window', '_crop_flat',
+        '_context_intents', '_contexts', '_handlers'
+    )
+    
     def __init__(self):
-        self.knowledge_base = self._load_knowledge_base()
+        self.knowledge_base = _KNOWLEDGE_BASE
         self.context_window = 5  # Number of previous interactions to consider
         
-    def _load_knowledge_base(self) -> Dict:
-        """Load agricultural knowledge base"""
-        return {
-            'crops': {
-                'wheat': {
-                    'sowing_season': 'Rabi (October-December)',
-                    'harvesting': 'April-May',
-                    'water_requirement': 'Medium (4-6 irrigations)',
-                    'fertilizer': 'NPK 120:60:40 kg/hectare',
-                    'varieties': ['HD-2967', 'PBW-343', 'DBW-17'],
-                    'diseases': ['Rust', 'Bunt', 'Leaf blight'],
-                    'ideal_temp': '15-25°C',
-                    'soil_ph': '6.0-7.5'
-                },
-                'rice': {
-                    'sowing_season': 'Kharif (May-July)',
-                    'harvesting': 'October-December',
-                    'water_requirement': 'High (standing water)',
-                    'fertilizer': 'NPK 100:50:50 kg/hectare',
-                    'varieties': ['Pusa-44', 'IR-64', 'Swarna'],
-                    'diseases': ['Blast', 'Sheath blight', 'Brown spot'],
-                    'ideal_temp': '20-35°C',
-                    'soil_ph': '5.5-7.0'
-                }
-            },
-            'weather_guidelines': {
-                'irrigation': {
-                    'high_humidity': 'Delay irrigation if humidity >80%',
-                    'rainfall_expected': 'Skip irrigation if rain expected within 24 hours',
-                    'temperature': 'Best irrigation time: early morning or evening'
-                },
-                'spraying': {
-                    'wind_speed': 'Avoid spraying if wind speed >10 km/h',
-                    'temperature': 'Spray when temperature <30°C',
-                    'humidity': 'Best humidity range: 60-80%'
-                }
-            },
-            'market_insights': {
-                'price_factors': [
-                    'Seasonal demand',
-                    'Weather conditions',
-                    'Government procurement',
-                    'Export policies',
-                    'Storage capacity'
-                ],
-                'selling_tips': [
-                    'Monitor MSP announcements',
-                    'Check multiple mandis',
-                    'Consider storage costs',
-                    'Track festival seasons'
-                ]
-            }
+        # Flat crop rows and prebuilt contexts shared by all instances
+        self._crop_flat = _CROP_FLAT
+        self._context_intents = _CONTEXT_INTENTS
+        self._contexts = _CONTEXTS
+        # Plain functions rather than bound methods, so the table holds no
+        # reference back to the instance; called as handler(self, ...)
+        self._handlers = {
+            INTENT_WEATHER: RAGEngine._generate_weather_response,
+            INTENT_IRRIGATION: RAGEngine._generate_weather_response,
+            INTENT_MARKET: RAGEngine._generate_market_response,
+            INTENT_FERTILIZER: RAGEngine._generate_fertilizer_response,
+            INTENT_PEST: RAGEngine._generate_pest_response
         }
         
     def retrieve_context(self, intent: str, entities: Dict, query: str) -> Dict:
-        """Retrieve relevant context from knowledge base"""
-        context = {'sources': [], 'facts': [], 'recommendations': []}
-        
-        # Crop-specific information
-        if 'crop' in entities:
-            crop = entities['crop']
-            if crop in self.knowledge_base['crops']:
-                crop_info = self.knowledge_base['crops'][crop]
-                context['facts'].extend([
-                    f"Sowing season: {crop_info['sowing_season']}",
-                    f"Water requirement: {crop_info['water_requirement']}",
-                    f"Recommended fertilizer: {crop_info['fertilizer']}"
-                ])
-                context['sources'].append(f"Crop Database - {crop.title()}")
-                
-        # Intent-specific guidelines
-        if intent == 'irrigation':
-            weather_guide = self.knowledge_base['weather_guidelines']['irrigation']
-            context['recommendations'].extend(list(weather_guide.values()))
-            context['sources'].append("Irrigation Best Practices")
-            
-        elif intent == 'market':
-            market_info = self.knowledge_base['market_insights']
-            context['facts'].extend(market_info['selling_tips'])
-            context['sources'].append("Market Intelligence")
-            
-        return context
+        """
+        Retrieve relevant context from knowledge base
+        Returns a shallow copy of the prebuilt context; its values are tuples
+        """
+        crop = entities.get('crop')
+        if crop not in self._crop_flat:
+            crop = None
+        if intent not in self._context_intents:
+            intent = None
+        return dict(self._contexts[(intent, crop)])
         
     def generate_response(self, intent: str, entities: Dict, context: Dict, 
                          real_time_data: Dict) -> Dict:
@@ -235,27 +615,19 @@ class RAGEngine:
             'warnings': []
         }
         
+        # Read current conditions once and pass them to the handlers
+        weather = (real_time_data.get('weather') or {}).get('current') or {}
+        temp = weather.get('temperature', 25)
+        humidity = weather.get('humidity', 60)
+        market = real_time_data.get('market') or {}
+        
         # Generate intent-specific responses
-        if intent == 'weather' or intent == 'irrigation':
-            response.update(self._generate_weather_response(
-                entities, context, real_time_data))
-                
-        elif intent == 'market':
-            response.update(self._generate_market_response(
-                entities, context, real_time_data))
-                
-        elif intent == 'fertilizer':
-            response.update(self._generate_fertilizer_response(
-                entities, context, real_time_data))
-                
-        elif intent == 'pest':
-            response.update(self._generate_pest_response(
-                entities, context, real_time_data))
-                
-        elif intent == 'scheme':
+        handler = self._handlers.get(intent)
+        if handler is not None:
+            response.update(handler(self, entities, context, temp, humidity, market))
+        elif intent == INTENT_SCHEME:
             response.update(self._generate_scheme_response(
                 entities, context, real_time_data))
-                
         else:
             response.update(self._generate_general_response(
                 entities, context, real_time_data))
@@ -263,23 +635,19 @@ class RAGEngine:
         return response
         
     def _generate_weather_response(self, entities: Dict, context: Dict, 
-                                 real_time_data: Dict) -> Dict:
+                                 temp: float, humidity: float, market: Dict) -> Dict:
         """Generate weather-based agricultural advice"""
-        weather = real_time_data.get('weather', {}).get('current', {})
-        
-        temp = weather.get('temperature', 25)
-        humidity = weather.get('humidity', 60)
-        
-        advice = f"Current conditions: {temp}°C, {humidity}% humidity. "
-        
         if humidity > 80:
-            advice += "High humidity detected. Delay irrigation and avoid fungicide spray."
+            advice = (f"Current conditions: {temp}°C, {humidity}% humidity. "
+                      "High humidity detected. Delay irrigation and avoid fungicide spray.")
             actions = ["Skip irrigation today", "Monitor for fungal diseases"]
         elif humidity < 40:
-            advice += "Low humidity. Increase irrigation frequency."
+            advice = (f"Current conditions: {temp}°C, {humidity}% humidity. "
+                      "Low humidity. Increase irrigation frequency.")
             actions = ["Provide extra watering", "Mulch around plants"]
         else:
-            advice += "Good conditions for normal farming activities."
+            advice = (f"Current conditions: {temp}°C, {humidity}% humidity. "
+                      "Good conditions for normal farming activities.")
             actions = ["Continue regular irrigation", "Good time for field operations"]
             
         return {
@@ -288,22 +656,65 @@ class RAGEngine:
             'confidence_score': 0.9
         }
         
+    @staticmethod
+    def _parse_change(change) -> Optional[float]:
+        """Parse a price change like 2.5, '+2.5%' or '-1%'; None if not numeric"""
+        if isinstance(change, (int, float)) and not isinstance(change, bool):
+            return float(change)
+        try:
+            return float(str(change).strip().rstrip('%'))
+        except ValueError:
+            return None
+            
+    @staticmethod
+    def _is_rising(change) -> bool:
+        """Whether a raw price change (2.5, '+2.5%', '+₹50', 'N/A') means a rise"""
+        if isinstance(change, str):
+            # A leading sign decides on its own, so '+0%' and '+₹50' read as
+            # rising and only unsigned strings need a float parse
+            sign = change.lstrip()[:1]
+            if sign == '+' or sign == '-':
+                return sign == '+'
+        elif isinstance(change, (int, float)) and not isinstance(change, bool):
+            return change > 0
+        change_pct = RAGEngine._parse_change(change)
+        return change_pct is not None and change_pct > 0
+        
+    @staticmethod
+    def normalize_market_data(market: Dict) -> Dict:
+        """
+        Parse the market price change once at ingestion time
+        Adds the numeric 'change_pct' (None if not numeric) and 'change_str'
+        """
+        change = market.get('change', 'N/A')
+        return {
+            **market,
+            'change_pct': RAGEngine._parse_change(change),
+            'change_str': str(change)
+        }
+        
     def _generate_market_response(self, entities: Dict, context: Dict,
-                                real_time_data: Dict) -> Dict:
+                                temp: float, humidity: float, market: Dict) -> Dict:
         """Generate market-based selling advice"""
-        market = real_time_data.get('market', {})
+        if 'change_pct' in market:
+            change = market.get('change_str', str(market.get('change', 'N/A')))
+            # Zero or non-numeric changes ('+0%', '+₹50', 'N/A') go by their sign
+            change_pct = market['change_pct']
+            rising = change_pct > 0 if change_pct else change.lstrip().startswith('+')
+        else:
+            change = market.get('change', 'N/A')
+            rising = self._is_rising(change)
         price = market.get('price', 0)
-        change = market.get('change', 'N/A')
         
         crop = entities.get('crop', 'your crop')
         
-        advice = f"Current {crop} price: ₹{price}/quintal ({change}). "
-        
-        if '+' in str(change):
-            advice += "Prices are rising. Good time to sell."
+        if rising:
+            advice = (f"Current {crop} price: ₹{price}/quintal ({change}). "
+                      "Prices are rising. Good time to sell.")
             actions = ["Sell immediately if ready", "Check nearby mandis for best rates"]
         else:
-            advice += "Prices declining. Consider waiting if possible."
+            advice = (f"Current {crop} price: ₹{price}/quintal ({change}). "
+                      "Prices declining. Consider waiting if possible.")
             actions = ["Store safely if possible", "Monitor price trends for 1 week"]
             
         return {
@@ -313,22 +724,21 @@ class RAGEngine:
         }
         
     def _generate_fertilizer_response(self, entities: Dict, context: Dict,
-                                    real_time_data: Dict) -> Dict:
+                                    temp: float, humidity: float, market: Dict) -> Dict:
         """Generate fertilizer recommendations"""
         crop = entities.get('crop', 'wheat')
         
-        if crop in self.knowledge_base['crops']:
-            fertilizer = self.knowledge_base['crops'][crop]['fertilizer']
-            advice = f"For {crop}: Apply {fertilizer}. "
-            
-            weather = real_time_data.get('weather', {}).get('current', {})
-            temp = weather.get('temperature', 25)
+        crop_info = self._crop_flat.get(crop)
+        if crop_info is not None:
+            fertilizer = crop_info[FERTILIZER]
             
             if temp > 30:
-                advice += "High temperature - apply in evening."
+                advice = (f"For {crop}: Apply {fertilizer}. "
+                          "High temperature - apply in evening.")
                 actions = ["Apply after 5 PM", "Water lightly after application"]
             else:
-                advice += "Good conditions for fertilizer application."
+                advice = (f"For {crop}: Apply {fertilizer}. "
+                          "Good conditions for fertilizer application.")
                 actions = ["Apply in morning hours", "Incorporate into soil"]
         else:
             advice = "General fertilizer recommendation: NPK 120:60:60 kg/hectare"
@@ -341,20 +751,17 @@ class RAGEngine:
         }
         
     def _generate_pest_response(self, entities: Dict, context: Dict,
-                               real_time_data: Dict) -> Dict:
+                               temp: float, humidity: float, market: Dict) -> Dict:
         """Generate pest management advice"""
         crop = entities.get('crop', 'crop')
         
-        advice = f"For {crop} pest management: Regular monitoring essential. "
-        
-        weather = real_time_data.get('weather', {}).get('current', {})
-        humidity = weather.get('humidity', 60)
-        
         if humidity > 75:
-            advice += "High humidity increases fungal disease risk."
+            advice = (f"For {crop} pest management: Regular monitoring essential. "
+                      "High humidity increases fungal disease risk.")
             actions = ["Spray preventive fungicide", "Improve air circulation"]
         else:
-            advice += "Current conditions moderate for pest activity."
+            advice = (f"For {crop} pest management: Regular monitoring essential. "
+                      "Current conditions moderate for pest activity.")
             actions = ["Weekly field monitoring", "Use pheromone traps"]
             
         return {